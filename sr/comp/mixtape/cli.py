@@ -1,18 +1,28 @@
+from __future__ import annotations
+
 import logging
 import os.path
 import time
 import warnings
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import List, Set
+from typing import Any, Iterable, List, Optional, Set, TYPE_CHECKING
 
 from ruamel import yaml
 
-from .audio import AudioController
-from .magicq import MagicqController
 from .mixtape import Mixtape, populate_filename_placeholder
-from .obs_studio import OBSStudioController
-from .scheduling import Scheduler
+
+if TYPE_CHECKING:
+    from .magicq import MagicqController
+    from .obs_studio import OBSStudioController
+    from .scheduling import FetchJSON
+    from .stream import EventStream, StreamEvent
+    from .warmer import VideoWarmer
+
+# Note: the controllers and the scheduler pull in comparatively heavy
+# dependencies (obswebsocket, pythonosc, requests, sseclient, dateutil), so are
+# imported only by the commands which need them.
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -45,8 +55,51 @@ def get_parser():
         default='coreaudio',
         help="Audio backend passed to `sox`",
     )
+    play.add_argument(
+        '--record',
+        metavar='FILE',
+        help='Record the event stream and API responses to the given file.',
+    )
     play.set_defaults(command='play')
 
+    replay = subparsers.add_parser(
+        'replay',
+        help=(
+            'Replay a recording made by `play --record` against stub '
+            'controllers and report the timing of the resulting cues.'
+        ),
+    )
+    replay.add_argument(
+        'mixtape_directory',
+        help='The folder containing the playlist.yaml and audio files',
+    )
+    replay.add_argument('recording', help='The recording to replay')
+    replay.add_argument(
+        '--speed',
+        type=positive_float,
+        default=1,
+        help='How many times faster than real time to replay the recording.',
+    )
+    replay.add_argument(
+        '--latency',
+        '-l',
+        type=int,
+        default=950,
+        help='In milliseconds.',
+    )
+    replay.add_argument(
+        '--output',
+        '-o',
+        metavar='FILE',
+        help='Save the cue timings to the given file.',
+    )
+    replay.add_argument(
+        '--compare',
+        metavar='FILE',
+        help='Compare the cue timings with those saved by a previous replay.',
+    )
+    replay.set_defaults(command='replay')
+
     verify = subparsers.add_parser(
         'verify',
         help='Verify the audio files in the mixtape are found.',
@@ -96,51 +149,188 @@ def parse_ranges(ranges: str) -> Set[int]:
     return set(result)
 
 
+def create_magicq_controller(playlist: Any) -> Optional[MagicqController]:
+    if 'magicq' not in playlist:
+        return None
+
+    from .magicq import MagicqController
+
+    config = playlist['magicq']
+    if config['port'] == 6553:
+        warnings.warn(
+            "You are using the default magicq remote protocol port. "
+            "Are you sure your OSC receive port is 6553?",
+            stacklevel=1,
+        )
+    return MagicqController(config['host'], config['port'])
+
+
+def create_obs_controller(playlist: Any) -> Optional[OBSStudioController]:
+    if 'obs_studio' not in playlist:
+        return None
+
+    from .obs_studio import OBSStudioController
+
+    config = playlist['obs_studio']
+    return OBSStudioController(
+        config['port'],
+        config['password'],
+        config['source_name'],
+        config['scene_name'],
+        config['preroll_time'],
+    )
+
+
+def create_video_warmer(playlist: Any) -> Optional[VideoWarmer]:
+    if 'obs_studio' not in playlist:
+        return None
+
+    from .warmer import MEGABYTE, VideoWarmer
+
+    config = playlist.get('video_cache', {})
+    bandwidth = config.get('bandwidth', 50)
+    memory = config.get('memory', 2048)
+    lookahead = config.get('lookahead', 1)
+
+    if bandwidth <= 0 or memory <= 0:
+        exit("video_cache bandwidth and memory must be positive.")
+    if lookahead < 0:
+        exit("video_cache lookahead must not be negative.")
+
+    return VideoWarmer(
+        bandwidth=bandwidth * MEGABYTE,
+        memory_budget=memory * MEGABYTE,
+        lookahead=lookahead,
+    )
+
+
+def connect_stream(stream_url: str) -> EventStream:
+    from .stream import EventStream
+
+    stream = EventStream(stream_url)
+    stream.connect()
+    return stream
+
+
+def positive_float(value: str) -> float:
+    result = float(value)
+    if result <= 0:
+        raise ArgumentTypeError(f"must be positive, not {value}")
+    return result
+
+
 def play(args):
+    start = time.perf_counter()
+
     with open(os.path.join(args.mixtape_directory, 'playlist.yaml')) as file:
         playlist = yaml.safe_load(file)
 
+    video_warmer = create_video_warmer(playlist)
+
+    # Connecting to OBS and to the event stream both block on the network, so
+    # set everything up concurrently to get back in sync as soon as possible
+    # after a restart.
+    with ThreadPoolExecutor() as executor:
+        magicq_future = executor.submit(create_magicq_controller, playlist)
+        obs_future = executor.submit(create_obs_controller, playlist)
+        stream_future = executor.submit(connect_stream, args.stream)
+
+        from .audio import AudioController
+        from .scheduling import fetch_json, Scheduler
+
+        audio_controller = AudioController(args.audio_backend)
+
+        magicq_controller = magicq_future.result()
+        obs_controller = obs_future.result()
+        stream = stream_future.result()
+
+    logging.debug(f"Started up in {time.perf_counter() - start:.3f}s")
+
+    mixtape = Mixtape(
+        args.mixtape_directory,
+        playlist,
+        audio_controller,
+        magicq_controller,
+        obs_controller,
+        video_warmer,
+    )
+
+    stream_source: Iterable[StreamEvent] = stream
+    fetch: FetchJSON = fetch_json
+    if args.record:
+        from .recording import Recorder
+
+        recorder = Recorder(args.record, api_url=args.api)
+        stream_source = recorder.record_stream(stream)
+        fetch = recorder.record_fetch(fetch)
+
+    scheduler = Scheduler(
+        api_url=args.api,
+        stream=stream_source,
+        latency=timedelta(seconds=args.latency / 1000),
+        generate_actions=mixtape.generate_play_actions,
+        fetch_json=fetch,
+    )
+
+    scheduler.run()
+
+
+def replay(args):
+    from .recording import (
+        CueLog,
+        load_cues,
+        print_cue_deltas,
+        Replay,
+        ReplayScheduler,
+        save_cues,
+        StubAudioController,
+        StubMagicqController,
+        StubOBSStudioController,
+    )
+
+    with open(os.path.join(args.mixtape_directory, 'playlist.yaml')) as file:
+        playlist = yaml.safe_load(file)
+
+    source = Replay(args.recording, speed=args.speed)
+    cues = CueLog(source.clock)
+
     magicq_controller = None
     if 'magicq' in playlist:
-        config = playlist['magicq']
-        if config['port'] == 6553:
-            warnings.warn(
-                "You are using the default magicq remote protocol port. "
-                "Are you sure your OSC receive port is 6553?",
-                stacklevel=1,
-            )
-        magicq_controller = MagicqController(config['host'], config['port'])
+        magicq_controller = StubMagicqController(cues)
 
     obs_controller = None
     if 'obs_studio' in playlist:
-        config = playlist['obs_studio']
-        obs_controller = OBSStudioController(
-            config['port'],
-            config['password'],
-            config['source_name'],
-            config['scene_name'],
-            config['preroll_time'],
+        obs_controller = StubOBSStudioController(
+            cues,
+            playlist['obs_studio']['preroll_time'],
         )
 
-    audio_controller = AudioController(args.audio_backend)
-
     mixtape = Mixtape(
         args.mixtape_directory,
         playlist,
-        audio_controller,
+        StubAudioController(cues),
         magicq_controller,
         obs_controller,
     )
 
-    scheduler = Scheduler(
-        api_url=args.api,
-        stream_url=args.stream,
+    scheduler = ReplayScheduler(
+        api_url=source.api_url,
+        stream=source,
         latency=timedelta(seconds=args.latency / 1000),
         generate_actions=mixtape.generate_play_actions,
+        fetch_json=source.fetch_json,
+        clock=source.clock,
+        sleep=source.sleep,
     )
 
     scheduler.run()
 
+    if args.output:
+        save_cues(args.output, cues.cues)
+
+    if args.compare:
+        print_cue_deltas(load_cues(args.compare), cues.cues)
+
 
 def verify_track(mixtape_dir, filename):
     path = os.path.join(mixtape_dir, filename)
@@ -186,6 +376,8 @@ def test(args):
     with open(os.path.join(args.mixtape_directory, 'playlist.yaml')) as file:
         playlist = yaml.safe_load(file)
 
+    from .magicq import MagicqController
+
     config = playlist['magicq']
     magicq_controller = MagicqController(config['host'], config['port'])
 
@@ -210,6 +402,8 @@ def main():
 
     if args.command == 'play':
         play(args)
+    elif args.command == 'replay':
+        replay(args)
     elif args.command == 'verify':
         verify(args)
     elif args.command == 'test':
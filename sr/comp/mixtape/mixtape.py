@@ -1,13 +1,27 @@
+from __future__ import annotations
+
 import functools
 import logging
 import os.path
 import subprocess
-from typing import Any, Callable, Dict, Iterator, Optional, Tuple
-
-from .audio import AudioController
-from .magicq import MagicqController
-from .obs_studio import OBSStudioController
-from .scheduling import Action, ActionSpec, Match
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    # These are only needed for annotations; avoiding importing them at
+    # runtime keeps this module (and so `verify`) cheap to import.
+    from .audio import AudioController
+    from .magicq import MagicqController
+    from .obs_studio import OBSStudioController
+    from .scheduling import Action, ActionSpec, Match
+    from .warmer import VideoWarmer
 
 
 def preload(filename: str):
@@ -30,6 +44,7 @@ class Mixtape:
         audio_controller: AudioController,
         magicq_controller: Optional[MagicqController],
         obs_studio_controller: Optional[OBSStudioController],
+        video_warmer: Optional[VideoWarmer] = None,
     ) -> None:
         self.root = os.path.abspath(root)
         self.playlist = playlist
@@ -37,6 +52,32 @@ class Mixtape:
         self.exclusivity_groups: Dict[object, subprocess.Popen[bytes]] = {}
         self.magicq_controller = magicq_controller
         self.obs_studio_controller = obs_studio_controller
+        self.video_warmer = video_warmer
+
+    def get_tracks(self, match_num: int) -> Any:
+        return self.playlist['tracks'].get(match_num, []) + self.playlist.get('all', [])
+
+    def get_video_paths(self, match_num: int) -> Iterator[str]:
+        for track in self.get_tracks(match_num):
+            if 'obs_video' in track:
+                filename = populate_filename_placeholder(track['obs_video'], match_num)
+                yield os.path.join(self.root, filename)
+
+    def warm_videos(self, match_num: int) -> None:
+        """
+        Warm the videos for the given match and those following it, releasing
+        those for matches which have already been played.
+        """
+        warmer = self.video_warmer
+        if warmer is None:
+            return
+
+        # Release first, so that the memory budget is available for the
+        # upcoming matches.
+        warmer.drop_matches_before(match_num)
+
+        for num in range(match_num, match_num + warmer.lookahead + 1):
+            warmer.warm_match(num, self.get_video_paths(num))
 
     def get_load_video_action(
         self,
@@ -54,9 +95,12 @@ class Mixtape:
         if self.obs_studio_controller is None:
             raise ValueError(f"Need a obs_studio_controller to play {path}")
         controller = self.obs_studio_controller
+        warmer = self.video_warmer
 
         def action() -> None:
             logging.info(f"Loading video {path}")
+            if warmer is not None:
+                warmer.report(path)
             controller.load_video(path)
 
         logging.debug(
@@ -176,7 +220,9 @@ class Mixtape:
         match: Match,
     ) -> Iterator[ActionSpec]:
         num = match['num']
-        tracks = self.playlist['tracks'].get(num, []) + self.playlist.get('all', [])
+        tracks = self.get_tracks(num)
+
+        self.warm_videos(num)
 
         for idx, track in enumerate(tracks):
             if 'filename' in track:
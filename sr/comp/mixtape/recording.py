@@ -0,0 +1,297 @@
+import datetime
+import json
+import logging
+import sched
+import subprocess
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from dateutil.tz import tzutc
+
+from .audio import AudioController
+from .magicq import MagicqController
+from .obs_studio import OBSStudioController
+from .scheduling import FetchJSON, Scheduler
+from .stream import StreamEvent
+
+FORMAT_VERSION = 1
+
+# (name, time the cue fired as a UNIX timestamp)
+Cue = Tuple[str, float]
+
+
+class Recorder:
+    """
+    Record the stream events and API responses received by a `Scheduler`,
+    along with the time at which each was received.
+
+    The recording is written as one compact JSON object per line, the first of
+    which is a header describing the recording.
+    """
+
+    def __init__(self, path: str, *, api_url: str) -> None:
+        self.file = open(path, mode='w', buffering=1)
+        self._lock = threading.Lock()
+        self._write({'kind': 'header', 'version': FORMAT_VERSION, 'api': api_url})
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        record['t'] = time.time()
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            self.file.write(line + '\n')
+
+    def record_stream(self, stream: Iterable[StreamEvent]) -> Iterator[StreamEvent]:
+        for message in stream:
+            self._write({
+                'kind': 'event',
+                'event': message.event,
+                'data': message.data,
+                'id': message.id,
+            })
+            yield message
+
+    def record_fetch(self, fetch_json: FetchJSON) -> FetchJSON:
+        def fetch(url: str, params: Optional[Dict[str, str]] = None) -> Any:
+            response = fetch_json(url, params=params)
+            self._write({
+                'kind': 'api',
+                'url': url,
+                'params': params,
+                'response': response,
+            })
+            return response
+
+        return fetch
+
+
+class Replay:
+    """
+    Replay a recording made by `Recorder`, at ``speed`` times real time.
+
+    This provides a stream, API and clock for a `Scheduler`. The clock is a
+    virtual one which starts at the time the recording began, so that the
+    (absolute) match times within the recording remain meaningful.
+    """
+
+    def __init__(self, path: str, *, speed: float = 1) -> None:
+        with open(path) as f:
+            header, *records = [json.loads(line) for line in f]
+
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {header.get('version')!r}")
+
+        self.api_url: str = header['api']
+        self.speed = speed
+        self.origin: float = header['t']
+        self.events = [x for x in records if x['kind'] == 'event']
+
+        self._responses: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            if record['kind'] == 'api':
+                self._responses.setdefault(record['url'], []).append(record)
+
+        self._started: Optional[float] = None
+        self._next_event_time = self.events[0]['t'] if self.events else float('inf')
+
+    def timestamp(self) -> float:
+        if self._started is None:
+            self._started = time.monotonic()
+        return self.origin + (time.monotonic() - self._started) * self.speed
+
+    def clock(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.timestamp(), tzutc())
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(max(seconds, 0) / self.speed)
+
+    def fetch_json(self, url: str, params: Optional[Dict[str, str]] = None) -> Any:
+        """
+        Return the latest response recorded for the given URL as of the current
+        point in the replay, so that code which makes a different number of
+        requests still sees the state of the competition at the right time.
+
+        Responses are recorded when they are received, which is after the
+        stream event which prompted the request. Responses received before the
+        next stream event are therefore also considered current.
+
+        Responses with the same parameters are preferred. Parameters often
+        include the current time (e.g. for ``/matches``), so if none match, any
+        response for the URL is used.
+        """
+        responses = self._responses.get(url)
+        if not responses:
+            logging.warning(f"No recorded response for {url}")
+            raise KeyError(url)
+
+        candidates = [x for x in responses if x['params'] == params] or responses
+
+        now = self.timestamp()
+        current = [
+            x for x in candidates
+            if x['t'] <= now or x['t'] < self._next_event_time
+        ]
+        if current:
+            return current[-1]['response']
+
+        logging.info(
+            f"No response for {url} recorded before "
+            f"{self.clock().isoformat()}, using the earliest",
+        )
+        return candidates[0]['response']
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        for record, next_record in zip(self.events, self.events[1:] + [None]):
+            self.sleep(record['t'] - self.timestamp())
+            self._next_event_time = (
+                next_record['t'] if next_record is not None else float('inf')
+            )
+            yield StreamEvent(record['event'], record['data'], record['id'])
+
+
+class ReplayScheduler(Scheduler):
+    """
+    A `Scheduler` which, once the stream is exhausted, waits for all of the
+    schedules it launched to complete.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.threads: List[threading.Thread] = []
+
+    def launch_schedule(self, schedule: sched.scheduler) -> threading.Thread:
+        thread = super().launch_schedule(schedule)
+        self.threads.append(thread)
+        return thread
+
+    def run(self) -> None:
+        super().run()
+        for thread in self.threads:
+            thread.join()
+
+
+class CueLog:
+    def __init__(self, clock: Callable[[], datetime.datetime]) -> None:
+        self.clock = clock
+        self.cues: List[Cue] = []
+        self._lock = threading.Lock()
+
+    def record(self, name: str) -> None:
+        when = self.clock()
+        logging.info(f"Cue {name} at {when.isoformat()}")
+        with self._lock:
+            self.cues.append((name, when.timestamp()))
+
+
+# The stub controllers record the cues they are given rather than acting on
+# them. They deliberately don't call their base class' constructors, which
+# would connect to the real services.
+
+class _StubProcess:
+    def terminate(self) -> None:
+        pass
+
+
+class StubAudioController(AudioController):
+    def __init__(self, cues: CueLog) -> None:
+        self.cues = cues
+
+    def play(
+        self,
+        filename: str,
+        output_device: str,
+        trim_start: float,
+    ) -> 'subprocess.Popen[bytes]':
+        self.cues.record(f'Audio({filename})')
+        return cast('subprocess.Popen[bytes]', _StubProcess())
+
+
+class StubMagicqController(MagicqController):
+    def __init__(self, cues: CueLog) -> None:
+        self.cues = cues
+
+    def activate_playback(self, playback: int) -> None:
+        self.cues.record(f'MagicQ({playback}, go)')
+
+    def release_playback(self, playback: int) -> None:
+        self.cues.record(f'MagicQ({playback}, release)')
+
+    def jump_to_cue(self, playback: int, cue_id: Union[int, float, str]) -> None:
+        self.cues.record(f'MagicQ({playback}, {cue_id})')
+
+
+class StubOBSStudioController(OBSStudioController):
+    def __init__(self, cues: CueLog, preroll_time: float) -> None:
+        self.cues = cues
+        self.preroll_time = preroll_time
+
+    def load_video(self, filename: str) -> None:
+        self.cues.record(f'OBSStudio(load={filename})')
+
+    def play_video(self) -> None:
+        self.cues.record('OBSStudio(play)')
+
+    def transition_scene(self, scene_name: str) -> None:
+        self.cues.record(f'OBSStudio(scene={scene_name})')
+
+
+def save_cues(path: str, cues: Iterable[Cue]) -> None:
+    with open(path, mode='w') as f:
+        for name, when in cues:
+            f.write(json.dumps({'cue': name, 't': when}) + '\n')
+
+
+def load_cues(path: str) -> List[Cue]:
+    with open(path) as f:
+        return [(x['cue'], x['t']) for x in map(json.loads, f)]
+
+
+def _index_cues(cues: Iterable[Cue]) -> Dict[Tuple[str, int], float]:
+    # Cues with the same name are distinguished by the order they fired in
+    counts: Dict[str, int] = {}
+    indexed = {}
+    for name, when in cues:
+        count = counts[name] = counts.get(name, 0) + 1
+        indexed[name, count] = when
+    return indexed
+
+
+def print_cue_deltas(baseline: Iterable[Cue], cues: Iterable[Cue]) -> None:
+    """
+    Print the difference in timing of each cue relative to a baseline run.
+    """
+    baseline_cues = _index_cues(baseline)
+    current_cues = _index_cues(cues)
+
+    deltas = []
+    for (name, count), when in sorted(current_cues.items(), key=lambda x: x[1]):
+        try:
+            baseline_when = baseline_cues.pop((name, count))
+        except KeyError:
+            print(f"{name} #{count}: not in baseline")
+            continue
+
+        delta = when - baseline_when
+        deltas.append(abs(delta))
+        print(f"{name} #{count}: {delta * 1000:+.1f}ms")
+
+    for name, count in baseline_cues:
+        print(f"{name} #{count}: missing")
+
+    if deltas:
+        print(
+            f"{len(deltas)} cues compared, mean |delta| "
+            f"{sum(deltas) / len(deltas) * 1000:.1f}ms, "
+            f"max |delta| {max(deltas) * 1000:.1f}ms",
+        )
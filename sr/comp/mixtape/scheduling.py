@@ -4,14 +4,25 @@ import logging
 import sched
 import threading
 import time
-from typing import Callable, cast, Iterable, List, NewType, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Iterable,
+    List,
+    NewType,
+    Optional,
+    Tuple,
+)
 from typing_extensions import Protocol, TypedDict
 
 import dateutil.parser
 import requests
-import sseclient  # type: ignore[import-untyped]
 from dateutil.tz import tzutc
 
+from .stream import RESYNC_EVENT, StreamEvent
+
 TLA = NewType('TLA', str)
 
 
@@ -59,23 +70,42 @@ class MatchSchedule(TypedDict):
     matches: List[Match]
 
 
+class CurrentState(TypedDict):
+    matches: List[Match]
+
+
+class FetchJSON(Protocol):
+    def __call__(self, url: str, params: Optional[Dict[str, str]] = None) -> Any:
+        "Fetch the given URL and return its decoded JSON content"
+
+
 def now_utc() -> datetime.datetime:
     return datetime.datetime.now(tzutc())
 
 
+def fetch_json(url: str, params: Optional[Dict[str, str]] = None) -> Any:
+    return requests.get(url, params=params).json()
+
+
 class Scheduler:
     def __init__(
         self,
         *,
         api_url: str,
-        stream_url: str,
+        stream: Iterable[StreamEvent],
         latency: datetime.timedelta,
         generate_actions: Callable[[CurrentOffset, Match], Iterable[ActionSpec]],
+        fetch_json: FetchJSON = fetch_json,
+        clock: Callable[[], datetime.datetime] = now_utc,
+        sleep: Callable[[float], None] = time.sleep,
     ) -> None:
         self.api_url = api_url
-        self.stream = sseclient.SSEClient(stream_url)
+        self.stream = stream
         self.latency = latency
         self.generate_actions = generate_actions
+        self.fetch_json = fetch_json
+        self.clock = clock
+        self.sleep = sleep
         self.current_generation = 0
 
     def perform_action(self, generation_number: int, action: Callable[[], None]) -> None:
@@ -89,7 +119,11 @@ class Scheduler:
         params = {
             'slot_start_time': start_time.isoformat() + '..',
         }
-        return cast(MatchSchedule, requests.get(url, params=params).json())
+        return cast(MatchSchedule, self.fetch_json(url, params=params))
+
+    def get_current_state(self) -> CurrentState:
+        url = '{}/current'.format(self.api_url)
+        return cast(CurrentState, self.fetch_json(url))
 
     def create_schedule_from(self, match: Match) -> sched.scheduler:
         num = match['num']
@@ -102,9 +136,9 @@ class Scheduler:
 
             If the match has not yet begun, the value returned is negative.
             """
-            return (now_utc() - game_start).total_seconds()
+            return (self.clock() - game_start).total_seconds()
 
-        schedule = sched.scheduler(current_offset, time.sleep)
+        schedule = sched.scheduler(current_offset, self.sleep)
 
         for when, priority, action in self.generate_actions(current_offset, match):
             schedule.enterabs(when, priority, self.perform_action, argument=(
@@ -124,19 +158,34 @@ class Scheduler:
         prev_match: Optional[Match] = None
 
         for message in self.stream:
-            if message.event not in ('match', 'current-delay'):
+            if message.event not in ('match', 'current-delay', RESYNC_EVENT):
                 continue
 
-            matches = json.loads(message.data)
-            if message.event == 'match' and matches:
+            if message.event == RESYNC_EVENT:
+                # We may have missed events while disconnected, backfill the
+                # current match from the API. This is handled as though it
+                # were a 'match' event.
+                logging.info('Resyncing current match after reconnection.')
+                try:
+                    matches = self.get_current_state()['matches']
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    logging.warning(f"Failed to fetch current match: {e!r}")
+                    continue
+            else:
+                matches = json.loads(message.data)
+
+            if message.event in ('match', RESYNC_EVENT) and matches:
                 match: Match = matches[0]
             else:
                 try:
-                    match_schedule = self.get_match_schedule(now_utc())
+                    match_schedule = self.get_match_schedule(self.clock())
                     match = match_schedule['matches'][0]
                 except (KeyError, IndexError):
                     logging.info('Waiting for a match.')
                     continue
+                except (requests.RequestException, ValueError) as e:
+                    logging.warning(f"Failed to fetch match schedule: {e!r}")
+                    continue
 
             if prev_match is not None:
                 if match['num'] == prev_match['num']:
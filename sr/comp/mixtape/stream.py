@@ -0,0 +1,197 @@
+import logging
+import random
+import time
+from typing import Iterator, NamedTuple, Optional
+
+import requests
+import sseclient  # type: ignore[import-untyped]
+import urllib3
+
+# Synthetic event emitted after each reconnection, asking the consumer to
+# backfill the current state from the API.
+RESYNC_EVENT = 'resync'
+
+
+class StreamEvent(NamedTuple):
+    event: str
+    data: str
+    id: Optional[str] = None  # noqa:A003
+
+
+class StreamDisconnected(Exception):
+    pass
+
+
+# sseclient reads from the underlying socket directly, so a dropped connection
+# (or a read timeout) can surface as any of these, not just as a requests error.
+DISCONNECTION_ERRORS = (
+    StreamDisconnected,
+    requests.RequestException,
+    urllib3.exceptions.ProtocolError,
+    OSError,
+)
+
+
+class _SingleConnectionSSEClient(sseclient.SSEClient):  # type: ignore[misc]
+    """
+    An `SSEClient` which raises on disconnection rather than reconnecting
+    itself, leaving the reconnection policy to its owner.
+    """
+
+    _connected = False
+
+    # sseclient sleeps for `retry` milliseconds (which the server may set)
+    # before reconnecting; pin it to zero as we handle our own backoff.
+    @property
+    def retry(self) -> int:
+        return 0
+
+    @retry.setter
+    def retry(self, value: int) -> None:
+        pass
+
+    def _connect(self) -> None:
+        if self._connected:
+            raise StreamDisconnected(self.url)
+        super()._connect()
+        self._connected = True
+
+
+class StreamStats:
+    def __init__(self) -> None:
+        self.reconnects = 0
+        self.missed_events = 0
+        self.last_recovery_time: Optional[float] = None
+        self.total_recovery_time = 0.0
+
+
+def count_missed_events(last_id: Optional[str], new_id: Optional[str]) -> int:
+    """
+    The number of events skipped between two event ids.
+
+    Only numeric, incrementing ids can be compared; any other ids are assumed
+    not to indicate a gap.
+    """
+    if last_id is None or new_id is None:
+        return 0
+    try:
+        gap = int(new_id) - int(last_id) - 1
+    except ValueError:
+        return 0
+    return max(gap, 0)
+
+
+class EventStream:
+    """
+    An iterable SSE stream which transparently reconnects when the connection
+    drops.
+
+    Reconnections use jittered exponential backoff and resume from the last
+    seen event id via the ``Last-Event-ID`` header. The backoff is only reset
+    once a connection has stayed up for ``min_uptime`` seconds, so that a
+    server which accepts connections and then immediately drops them isn't
+    hammered.
+
+    If nothing (including keep-alive comments) is received for ``read_timeout``
+    seconds the connection is assumed to be half-open and is treated as having
+    dropped.
+
+    After each successful reconnection a synthetic `RESYNC_EVENT` is
+    yielded so that the consumer can backfill anything which happened while
+    disconnected.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        min_backoff: float = 0.1,
+        max_backoff: float = 10,
+        min_uptime: float = 10,
+        read_timeout: float = 60,
+    ) -> None:
+        self.url = url
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.min_uptime = min_uptime
+        self.read_timeout = read_timeout
+        self.last_id: Optional[str] = None
+        self.stats = StreamStats()
+        self._client: Optional[_SingleConnectionSSEClient] = None
+        self._attempt = 0
+        self._connected_at = 0.0
+
+    def backoff_delay(self, attempt: int) -> float:
+        # "Full jitter", so that many clients don't reconnect in lockstep
+        ceiling = min(self.max_backoff, self.min_backoff * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def _connect(self) -> _SingleConnectionSSEClient:
+        client = _SingleConnectionSSEClient(
+            self.url,
+            last_id=self.last_id,
+            timeout=self.read_timeout,
+        )
+        self._connected_at = time.monotonic()
+        return client
+
+    def connect(self) -> None:
+        """
+        Open the connection ahead of iterating over the stream, so that this can
+        overlap with other startup work.
+        """
+        if self._client is None:
+            self._client = self._connect()
+
+    def _reconnect(self, disconnected_at: float) -> _SingleConnectionSSEClient:
+        if disconnected_at - self._connected_at >= self.min_uptime:
+            self._attempt = 0
+
+        attempts = 0
+        while True:
+            delay = self.backoff_delay(self._attempt)
+            self._attempt += 1
+            attempts += 1
+            time.sleep(delay)
+
+            try:
+                client = self._connect()
+            except DISCONNECTION_ERRORS as e:
+                logging.warning(f"Failed to reconnect to event stream: {e!r}")
+                continue
+
+            recovery_time = time.monotonic() - disconnected_at
+            self.stats.reconnects += 1
+            self.stats.last_recovery_time = recovery_time
+            self.stats.total_recovery_time += recovery_time
+            logging.info(
+                f"Reconnected to event stream after {recovery_time:.3f}s "
+                f"({attempts} attempts)",
+            )
+            return client
+
+    def __iter__(self) -> Iterator[StreamEvent]:
+        client = self._client or self._connect()
+        self._client = None
+
+        while True:
+            try:
+                for message in client:
+                    missed = count_missed_events(self.last_id, message.id)
+                    if missed:
+                        self.stats.missed_events += missed
+                        logging.warning(
+                            f"Missed {missed} events on the event stream "
+                            f"({self.stats.missed_events} in total)",
+                        )
+
+                    if message.id:
+                        self.last_id = message.id
+
+                    yield StreamEvent(message.event, message.data, message.id)
+
+            except DISCONNECTION_ERRORS as e:
+                logging.warning(f"Lost connection to event stream: {e!r}")
+
+            client = self._reconnect(disconnected_at=time.monotonic())
+            yield StreamEvent(RESYNC_EVENT, '')
@@ -0,0 +1,213 @@
+import enum
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Set
+
+MEGABYTE = 1024 * 1024
+
+# posix_fadvise isn't available on all platforms (notably macOS), in which
+# case played videos are left for the OS to evict in its own time.
+HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+
+class WarmStatus(enum.Enum):
+    QUEUED = 'queued'
+    WARMING = 'warming'
+    WARM = 'warm'
+    SKIPPED = 'skipped'  # would have exceeded the memory budget
+    FAILED = 'failed'
+
+
+class VideoWarmer:
+    """
+    Pull upcoming videos into the OS page cache in the background, so that OBS
+    doesn't have to load them from a cold disk when they are about to play.
+
+    Files are warmed by reading them through in chunks, limited to
+    ``bandwidth`` bytes per second so that warming doesn't starve media which
+    is currently playing. Reads are used rather than readahead hints
+    (``POSIX_FADV_WILLNEED``) since hints are asynchronous: reading both
+    bounds the actual disk I/O and means that a video reported as warm really
+    has been loaded into the cache (unless the OS has since evicted it).
+
+    At most ``memory_budget`` bytes of video are kept warm; once all the
+    matches which use a video have been played its pages are dropped from the
+    cache again. Videos which don't fit in the budget are skipped until some
+    budget has been freed.
+
+    ``lookahead`` is the number of matches beyond the current one whose videos
+    should be warmed.
+    """
+
+    def __init__(
+        self,
+        *,
+        bandwidth: float,
+        memory_budget: int,
+        lookahead: int,
+        chunk_size: int = 8 * MEGABYTE,
+    ) -> None:
+        self.bandwidth = bandwidth
+        self.memory_budget = memory_budget
+        self.lookahead = lookahead
+        self.chunk_size = chunk_size
+
+        self._lock = threading.Lock()
+        self._statuses: Dict[str, WarmStatus] = {}
+        self._sizes: Dict[str, int] = {}
+        self._users: Dict[str, Set[int]] = {}
+        self._queue: 'queue.Queue[str]' = queue.Queue()
+
+        self.hits = 0
+        self.misses = 0
+
+        thread = threading.Thread(target=self._run, name='video-warmer')
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def reserved_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def warm_match(self, match_num: int, paths: Iterable[str]) -> None:
+        """
+        Queue the given videos, used by the given match, for warming.
+        """
+        with self._lock:
+            for path in paths:
+                self._users.setdefault(path, set()).add(match_num)
+
+                if self._statuses.get(path) in (
+                    WarmStatus.QUEUED,
+                    WarmStatus.WARMING,
+                    WarmStatus.WARM,
+                    WarmStatus.SKIPPED,
+                ):
+                    continue
+
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+
+                if self.reserved_bytes + size > self.memory_budget:
+                    logging.warning(
+                        f"Not warming {path} as it would exceed the video "
+                        "cache memory budget",
+                    )
+                    self._statuses[path] = WarmStatus.SKIPPED
+                    continue
+
+                self._sizes[path] = size
+                self._statuses[path] = WarmStatus.QUEUED
+                self._queue.put(path)
+
+    def drop_matches_before(self, match_num: int) -> None:
+        """
+        Release the videos which are only used by matches before the given one.
+        """
+        with self._lock:
+            freed = False
+            for path, users in list(self._users.items()):
+                users = self._users[path] = {x for x in users if x >= match_num}
+                if users:
+                    continue
+
+                del self._users[path]
+                self._statuses.pop(path, None)
+                if self._sizes.pop(path, None) is not None:
+                    self._drop(path)
+                    freed = True
+
+            if freed:
+                # Allow previously skipped videos to be retried
+                for path, status in list(self._statuses.items()):
+                    if status == WarmStatus.SKIPPED:
+                        del self._statuses[path]
+
+    def report(self, path: str) -> None:
+        """
+        Record and log whether the given video was warm at the point of use.
+        """
+        with self._lock:
+            status = self._statuses.get(path)
+            if status == WarmStatus.WARM:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hits, misses = self.hits, self.misses
+
+        if status == WarmStatus.WARM:
+            logging.info(f"Video {path} is warm")
+        else:
+            state = status.value if status is not None else 'not queued'
+            logging.warning(f"Video {path} is not warm ({state})")
+
+        logging.debug(f"Video cache: {hits} warm hits, {misses} misses")
+
+    def _drop(self, path: str) -> None:
+        if not HAS_FADVISE:
+            return
+
+        logging.debug(f"Dropping {path} from the page cache")
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+    def _is_wanted(self, path: str) -> bool:
+        with self._lock:
+            return self._statuses.get(path) == WarmStatus.WARMING
+
+    def _set_status(self, path: str, status: WarmStatus) -> None:
+        with self._lock:
+            # Don't resurrect paths which were dropped while being warmed
+            if path in self._statuses:
+                self._statuses[path] = status
+
+    def _warm(self, path: str) -> None:
+        start = time.monotonic()
+        warmed = 0
+        buffer = bytearray(self.chunk_size)
+
+        with open(path, mode='rb', buffering=0) as f:
+            while True:
+                if not self._is_wanted(path):
+                    return
+
+                length = f.readinto(buffer)
+                if not length:
+                    break
+                warmed += length
+
+                # Stay within the bandwidth budget
+                ahead = warmed / self.bandwidth - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        self._set_status(path, WarmStatus.WARM)
+        logging.debug(f"Warmed {path} in {time.monotonic() - start:.3f}s")
+
+    def _run(self) -> None:
+        while True:
+            path = self._queue.get()
+
+            with self._lock:
+                if self._statuses.get(path) != WarmStatus.QUEUED:
+                    continue
+                self._statuses[path] = WarmStatus.WARMING
+
+            try:
+                self._warm(path)
+            except OSError as e:
+                logging.warning(f"Failed to warm {path}: {e}")
+                with self._lock:
+                    self._sizes.pop(path, None)
+                self._set_status(path, WarmStatus.FAILED)